@@ -10,143 +10,128 @@ Description:
 --------------------------------------------------------------------------------
 """
 
-import sqlite3
 from models.pydantic_models import RecipeSummary
-from helper.db_recipe import get_recipe_ingredients, get_recipe
-from helper.db_pantry import select_user_pantry
+from helper.db_conn import get_conn, transaction
 from helper.logger import logger, sql_logger
 
-DB_FILE = "cloudcookbook.db"
+# --- SQL STATEMENTS ---
+# Defined once at module level, so the identical string hits SQLite's statement cache on every call.
+
+# A recipe is cookable if it has ingredients and none of them is missing
+SQL_COOKABLE_RECIPES = """
+    SELECT r.recipe_id, r.recipe_name, r.description, r.recipe_creator, r.time_needed
+    FROM recipe r
+    WHERE EXISTS (SELECT 1 FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id)
+    AND NOT EXISTS (
+        SELECT 1
+        FROM recipe_ingredients ri
+        LEFT JOIN pantry p ON p.uid = ? AND p.ingredient_id = ri.ingredient_id
+        WHERE ri.recipe_id = r.recipe_id
+        AND COALESCE(p.amount, 0) < ri.needed
+    )
+    ORDER BY r.recipe_id
+    """
+# Everything cook_recipe needs to know in ONE round trip: one row per ingredient
+# (LEFT JOINs, so a recipe without ingredients still returns its name with NULL columns)
+SQL_COOK_PREFLIGHT = """
+    SELECT r.recipe_name, ri.ingredient_id, i.ingredient_name, ri.needed, COALESCE(p.amount, 0)
+    FROM recipe r
+    LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.recipe_id
+    LEFT JOIN items i ON i.ingredient_id = ri.ingredient_id
+    LEFT JOIN pantry p ON p.uid = ? AND p.ingredient_id = ri.ingredient_id
+    WHERE r.recipe_id = ?
+    """
+SQL_COOK_UPDATE = "UPDATE pantry SET amount = amount - ? WHERE uid = ? AND ingredient_id = ?"
 
 def get_cookable_recipes(uid: int) -> list[RecipeSummary]:
     """
     Matchmaking Logic:
-    1. Loads the User's entire pantry into a Dictionary for O(1) lookups.
-    2. Loads ALL Recipe requirements in a single optimized query.
-    3. Compares them to find matches where User Amount >= Needed Amount.
+    The whole comparison runs inside SQLite in ONE query.
+    A recipe is cookable if it has ingredients and NONE of them is missing,
+    i.e. there is no ingredient where User Amount (0 if not in pantry) < Needed Amount.
     """
-    
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_conn()
     cursor = conn.cursor()
-    
-    # Get User Pantry
-    sql = "SELECT ingredient_id, amount FROM pantry WHERE uid = ?"
-    sql_logger.info(f"Query: {sql} | Params: {(uid,)}")
 
-    cursor.execute("SELECT ingredient_id, amount FROM pantry WHERE uid = ?", (uid,))
-    user_pantry = {row[0]: row[1] for row in cursor.fetchall()}
-    if not user_pantry:
-        logger.debug(f"User {uid} has an empty pantry. Returning 0 matches.")
-        conn.close()
-        return []
-    
-    # Get All Recipes & Their Ingredients
-    sql = """
-    SELECT r.recipe_id, r.recipe_name, r.description, r.time_needed, ri.ingredient_id, ri.needed, r.recipe_creator
-    FROM recipe r
-    JOIN recipe_ingredients ri ON r.recipe_id = ri.recipe_id
-    """
-    sql_logger.info(f"Query: {sql}")
-    cursor.execute(sql)
-    rows = cursor.fetchall()
-    conn.close()
-    
-    # Organize Data
-    recipes_map = {}
-    for r_id, r_name, r_desc, r_time, ing_id, needed, r_creator in rows:
-        if r_id not in recipes_map:
-            recipes_map[r_id] = {
-                "summary": RecipeSummary(
-                    recipe_id=r_id, 
-                    recipe_name=r_name, 
-                    time_needed=r_time, 
-                    recipe_creator=r_creator, 
-                    description=r_desc
-                ),
-                "requirements": {}
-            }
-        recipes_map[r_id]["requirements"][ing_id] = needed
-        
-    # Comparison Logic
-    cookable_recipes = []
-    for r_id, data in recipes_map.items():
-        requirements = data["requirements"]
-        can_cook = True
-        
-        for ing_id, amount_needed in requirements.items():
-            # Check 1: Do we have the ingredient ID?
-            # Check 2: Do we have ENOUGH of it?
-            user_amount = user_pantry.get(ing_id, 0)
-            
-            if user_amount < amount_needed:
-                can_cook = False
-                break # Optimization: Stop checking this recipe immediately if one item fails
-        
-        if can_cook:
-            cookable_recipes.append(data["summary"])
-            
-        logger.info(f"Matchmaking for User {uid}: Found {len(cookable_recipes)} cookable recipes.")
+    sql_logger.debug("Query: %s | Params: %s", SQL_COOKABLE_RECIPES, (uid,))
+    cursor.execute(SQL_COOKABLE_RECIPES, (uid,))
+
+    # Rows come straight from our own DB -> skip Pydantic validation (model_construct)
+    cookable_recipes = [
+        RecipeSummary.model_construct(
+            recipe_id=r_id,
+            recipe_name=r_name,
+            description=r_desc,
+            recipe_creator=r_creator,
+            time_needed=r_time
+        )
+        for r_id, r_name, r_desc, r_creator, r_time in cursor # streams rows, no intermediate list
+    ]
+    logger.info(f"Matchmaking for User {uid}: Found {len(cookable_recipes)} cookable recipes.")
     return cookable_recipes
+
+def get_cook_preflight(uid: int, recipe_id: int) -> list[tuple]:
+    """
+    Fetches recipe name, ingredients, needed and available amounts in a single query.
+    Returns rows of (recipe_name, ingredient_id, ingredient_name, needed, have).
+    Empty list -> recipe does not exist.
+    """
+    conn = get_conn()
+    params = (uid, recipe_id)
+    sql_logger.debug("Query: %s | Params: %s", SQL_COOK_PREFLIGHT, params)
+    return conn.execute(SQL_COOK_PREFLIGHT, params).fetchall()
     
 def cook_recipe(uid: int, recipe_id: int) -> dict:
     """
     Transactional Cooking Action:
-    1. Validates ingredient availability
-    2. Opens a Database Transaction.
-    3. Deducts ingredients one by one.
+    1. Opens a Database Transaction (BEGIN IMMEDIATE -> write lock first).
+    2. Validates ingredient availability (ONE combined pre-flight query).
+    3. Deducts all ingredients in ONE batch (executemany).
     4. Commits on success or Rolls Back on error.
+    The check runs INSIDE the write transaction, so a concurrent cook can't use up
+    the stock between the check and the deduction.
     """
-    # --- Pre-Flight Validation ---
-    requirements = get_recipe_ingredients(recipe_id)
-    user_pantry = select_user_pantry(uid)
-    recipe_info = get_recipe(recipe_id)
-    if not recipe_info:
-        return {"status": "error", "message": "Recipe not found."}
+    conn = get_conn()
+    try:
+        # BEGIN IMMEDIATE ... COMMIT, Rollback happens automatically on error
+        with transaction(conn, "IMMEDIATE"):
+            # --- Pre-Flight Validation ---
+            rows = get_cook_preflight(uid, recipe_id)
+            if not rows:
+                return {"status": "error", "message": "Recipe not found."}
+            recipe_name = rows[0][0]
+            # Drop the NULL row of a recipe without ingredients
+            requirements = [row for row in rows if row[1] is not None]
 
-    # Validation Loop
-    missing_items = []
-    for ingredient_name, needed_amount in requirements.items():
-        user_has = user_pantry.get(ingredient_name, 0)
-        
-        if user_has < needed_amount:
-            missing_items.append(f"{ingredient_name} (Need {needed_amount}, Have {user_has})")
+            # Validation: every ingredient where the user has less than needed
+            missing_items = [
+                f"{ingredient_name} (Need {needed_amount}, Have {have_amount})"
+                for _, _, ingredient_name, needed_amount, have_amount in requirements
+                if have_amount < needed_amount
+            ]
+
+            if missing_items:
+                logger.warning(f"User {uid} failed to cook {recipe_id}. Missing: {missing_items}")
+                return {
+                    "status": "failed", 
+                    "message": "Not enough ingredients!", 
+                    "missing": missing_items
+                }
+
+            # Execution of removal
+            logger.info(f"User {uid} cooking '{recipe_name}'...")
+            # Same connection as the pre-flight query, the IDs are already known -> one batch update
+            params = [(needed_amount, uid, ingredient_id) for _, ingredient_id, _, needed_amount, _ in requirements]
+            sql_logger.debug("Query: %s | Batch Size: %s", SQL_COOK_UPDATE, len(params))
+            conn.executemany(SQL_COOK_UPDATE, params)
 
-    if missing_items:
-        logger.warning(f"User {uid} failed to cook {recipe_id}. Missing: {missing_items}")
-        return {
-            "status": "failed", 
-            "message": "Not enough ingredients!", 
-            "missing": missing_items
-        }
-        
-    # Execution of removal
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    try:
-        logger.info(f"User {uid} cooking '{recipe_info.recipe_name}'...")
-        # Iterate and Subtract
-        for ingredient_name, needed_amount in requirements.items():
-            # Subtraction Query
-            sql = """
-            UPDATE pantry 
-            SET amount = amount - ? 
-            WHERE uid = ? 
-            AND ingredient_id = (SELECT ingredient_id FROM items WHERE ingredient_name = ?)
-            """
-            sql_logger.info(f"Query: {sql} | Params: {(needed_amount, uid, ingredient_name)}")
-            cursor.execute(sql, (needed_amount, uid, ingredient_name))
-            
-        conn.commit()
         logger.info(f"Cooking complete. Pantry updated for User {uid}.")
         
         return {
             "status": "success", 
-            "message": f"Successfully cooked {recipe_info.recipe_name}! Ingredients removed from pantry."
+            "message": f"Successfully cooked {recipe_name}! Ingredients removed from pantry."
         }
     except Exception as e:
-        conn.rollback() # Undo changes if something crashes halfway!
+        # transaction() already undid the changes if something crashed halfway!
         logger.error(f"Cooking Transaction Failed: {e}")
         return {"status": "error", "message": "Database error during cooking."}
-        
-    finally:
-        conn.close()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   db_conn.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+Last Updated:  2026-10-15
+
+Description:
+    This module manages the SQLite connections used by the helper modules.
+    Instead of opening (and closing) a new file handle on every function call,
+    every worker thread keeps ONE long-lived connection that is configured once.
+
+    Key Features:
+    - get_conn: Returns the connection of the current thread (lazy creation on first use,
+      i.e. in the worker thread that runs the endpoint).
+    - init_pool: Starts a new pool generation during the FastAPI lifespan startup.
+    - close_pool: Closes the connections of ALL threads on shutdown (registry), threads that
+      are reused afterwards transparently open a new one.
+    - transaction: Context manager for explicit BEGIN / COMMIT / ROLLBACK.
+      Single writer: only one write transaction runs at a time per process.
+    - on_commit: Runs a callback once the open transaction is committed (dropped on rollback),
+      e.g. to fill caches only with data that really is in the DB.
+    - connect: Opens a new, fully configured connection (WAL, synchronous=NORMAL, ...)
+      to the configured DB. Also used by setup/seeding and db_user.
+    - COOKBOOK_DB: Env var to choose the database. COOKBOOK_DB=":memory:" runs everything
+      on a throwaway DB file in a temp directory (RAM-backed /dev/shm if available),
+      re-seeded on every start and deleted on exit (dev/test runs).
+
+Dependencies:
+    - sqlite3
+    - threading
+    - os
+    - tempfile / shutil / atexit (throwaway DB for COOKBOOK_DB=":memory:")
+--------------------------------------------------------------------------------
+"""
+
+import atexit
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from helper.logger import logger
+
+DB_FILE = os.getenv("COOKBOOK_DB", "cloudcookbook.db")
+IN_MEMORY = DB_FILE == ":memory:"
+if IN_MEMORY:
+    # A real ":memory:" DB can't be shared between the pool connections (every connection gets its own
+    # empty DB), and a shared-cache one fails with SQLITE_LOCKED under concurrent access (busy_timeout
+    # doesn't apply). So the mode is backed by a throwaway file instead: same WAL / locking behaviour
+    # as file mode, and on Linux /dev/shm keeps it in RAM anyway.
+    _memory_dir = tempfile.mkdtemp(prefix="cloudcookbook-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    DB_FILE = os.path.join(_memory_dir, "cloudcookbook.db")
+    atexit.register(shutil.rmtree, _memory_dir, ignore_errors=True)
+
+# Every thread gets its own connection object (stored in _local.conn)
+_local = threading.local()
+# Registry of all connections (of every thread), so they can be closed on shutdown
+_connections: list[sqlite3.Connection] = []
+_registry_lock = threading.Lock()
+# Bumped by close_pool(): a thread-local connection from an older generation is closed -> reopen
+_generation = 0
+# SQLite allows only ONE writer anyway. Waiting writers queue up on this lock (and are woken
+# up as soon as it is free) instead of polling SQLite's busy handler with sleep + retry.
+# Readers are not affected (WAL).
+_write_lock = threading.Lock()
+
+# journal_mode=WAL is stored in the DB file itself -> only needs to be switched on once per process
+_wal_enabled = False
+
+def connect(**kwargs) -> sqlite3.Connection:
+    """
+    Opens a new connection to the configured database file
+    and applies the per-connection PRAGMAs. Used for EVERY connection (pool, db_user, setup/seeding).
+    """
+    global _wal_enabled
+    conn = sqlite3.connect(DB_FILE, **kwargs)
+    if not _wal_enabled:
+        conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer (persistent)
+        _wal_enabled = True
+    # One fsync less per commit (safe in WAL mode). The throwaway DB doesn't need any fsync.
+    conn.execute("PRAGMA synchronous=OFF" if IN_MEMORY else "PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")   # Read pages via 256 MB memory map instead of read() calls
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")     # ~20 MB page cache (per connection!)
+    # Not persistent, needed on every connection. Since the pooled connections (pantry, cooking, ...)
+    # enforce it, writes referencing a missing user/item are rejected: e.g. POST /pantry/{uid}
+    # for an unknown uid returns 400 instead of inserting an orphan pantry row.
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+def _open_connection() -> sqlite3.Connection:
+    """Opens a long-lived pool connection (PRAGMAs are applied only once per connection, see connect)."""
+    # isolation_level=None -> autocommit, transactions are opened explicitly via transaction()
+    # cached_statements: prepared statements kept per connection (LRU, keyed by the SQL string)
+    conn = connect(check_same_thread=False, isolation_level=None, cached_statements=256)
+    logger.debug(f"Opened new SQLite connection for thread '{threading.current_thread().name}'")
+    return conn
+
+def get_conn() -> sqlite3.Connection:
+    """
+    Returns the connection of the current thread.
+    The connection is created on first access and reused afterwards.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = _open_connection()
+        with _registry_lock:
+            _connections.append(conn)
+            _local.conn = conn
+            _local.generation = _generation
+    return conn
+
+def init_pool() -> None:
+    """
+    Starts the pool (called from the lifespan in main.py).
+    No connection is opened here: the lifespan runs on the event loop thread, but the (sync)
+    endpoints run in FastAPI's thread pool, so every worker opens its own one on first use.
+    """
+    logger.info(f"Database connection pool initialized for '{DB_FILE}' (generation {_generation})")
+
+def close_pool() -> None:
+    """Closes every connection that was opened by get_conn(), in ALL threads."""
+    global _generation
+    with _registry_lock:
+        for conn in _connections:
+            conn.close()
+        closed = len(_connections)
+        _connections.clear()
+        # Other threads still hold their (now closed) connection in _local -> they reopen on next use
+        _generation += 1
+    logger.info(f"Database connection pool closed ({closed} connections)")
+
+def on_commit(conn: sqlite3.Connection, callback) -> None:
+    """
+    Runs the callback after the transaction that is open on conn has been committed.
+    On rollback the callback is dropped. Without an open transaction it runs right away.
+    """
+    pending = getattr(_local, "on_commit", None)
+    if conn.in_transaction and pending is not None:
+        pending.append(callback)
+    else:
+        callback()
+
+@contextmanager
+def transaction(conn: sqlite3.Connection, mode: str = "DEFERRED"):
+    """
+    Opens an explicit (write) transaction on the given connection.
+    Commits on success, rolls back if an exception is raised inside the block.
+    If a transaction is already running, the block simply joins it.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    with _write_lock:
+        conn.execute(f"BEGIN {mode}")
+        # Callbacks registered via on_commit() while this transaction is open
+        pending = _local.on_commit = []
+        try:
+            yield conn
+            # COMMIT can fail too (e.g. deferred FK violation, disk full). It has to be rolled back
+            # as well, otherwise the pooled connection stays in_transaction and every later
+            # transaction() would "join" a transaction that is never committed.
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            # Only after a successful COMMIT
+            for callback in pending:
+                callback()
+        finally:
+            _local.on_commit = None
@@ -10,110 +10,157 @@ Description:
     duplicate item creation.
 
     Key Features:
-    - get_item_name: Resolves ID -> String (Safe Read)
-    - get_item_id: Resolves String -> ID (Safe Read)
-    - create_item: Creates new global ingredients (Atomic Write with Duplicate Check)
+    - get_item_name: Resolves ID -> String (None = not found, DB errors are raised)
+    - get_item_id: Resolves String -> ID (None = not found, DB errors are raised)
+    - create_item: Creates new global ingredients (Atomic Write, duplicates ignored by the UNIQUE index)
+    - resolve_item_ids: Resolves MANY names -> IDs at once, missing items are created in one batch
+    - Name <-> ID Cache: Lookups are cached per process (LRU, ITEM_CACHE_SIZE entries).
+      Items are only ever added (never renamed or deleted), so a found ID/Name can't
+      go stale. Inside a transaction, pairs are only cached after the COMMIT (a rolled back
+      item would otherwise keep its ID in the cache). Misses are NOT cached, so items created by another worker process are
+      still found (that's why functools.lru_cache isn't used, it would also cache the misses).
 
 Dependencies:
     - sqlite3
+    - db_conn (shared connection)
 --------------------------------------------------------------------------------
 """
 
 
 
 import sqlite3
+import threading
+from collections import OrderedDict
+from helper.db_conn import get_conn, transaction, on_commit
 from helper.logger import logger, sql_logger
-database = "cloudcookbook.db"
+
+# --- SQL STATEMENTS ---
+# Hot lookups, defined once at module level: the identical string is a hit in the
+# connection's statement cache (cached_statements in db_conn), so it's only parsed once.
+SQL_GET_ITEM_NAME = "SELECT ingredient_name FROM items WHERE ingredient_id = ?"
+SQL_GET_ITEM_ID = "SELECT ingredient_id FROM items WHERE ingredient_name = ?"
+# OR IGNORE / ON CONFLICT: the UNIQUE index on ingredient_name does the duplicate check
+SQL_INSERT_ITEM = "INSERT OR IGNORE INTO items (ingredient_name) VALUES (?)"
+# Single item: insert + get the new ID in one statement (no row returned -> already exists)
+SQL_CREATE_ITEM = """
+    INSERT INTO items (ingredient_name) VALUES (?)
+    ON CONFLICT(ingredient_name) DO NOTHING
+    RETURNING ingredient_id
+    """
+
+# Per-process LRU lookup caches (only successful lookups are stored)
+ITEM_CACHE_SIZE = 8192
+_item_id_cache: OrderedDict[str, int] = OrderedDict()
+_item_name_cache: OrderedDict[int, str] = OrderedDict()
+_cache_lock = threading.Lock() # requests run in FastAPI's thread pool
+
+def _cached(cache: OrderedDict, key):
+    """Returns the cached value (or None) and marks it as recently used."""
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _remember_item(item_id: int, item_name: str) -> None:
+    """Stores a known ID <-> Name pair in both caches, evicting the least recently used entry if full."""
+    with _cache_lock:
+        for cache, key, value in ((_item_id_cache, item_name, item_id), (_item_name_cache, item_id, item_name)):
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > ITEM_CACHE_SIZE:
+                cache.popitem(last=False)
+
+def _remember_items(name_to_id: dict[str, int]) -> None:
+    """Stores many Name -> ID pairs at once (see _remember_item)."""
+    for item_name, item_id in name_to_id.items():
+        _remember_item(item_id, item_name)
+
+def _remember_item_committed(conn: sqlite3.Connection, item_id: int, item_name: str) -> None:
+    """Caches the pair right away, or - if conn is inside a transaction - only once it is committed."""
+    on_commit(conn, lambda: _remember_item(item_id, item_name))
 
 def get_item_name(item_id: int) -> str | None:
     """
     Searches for an ingredient_name by ID.
-    Returns the name of the item as a String, or "N/A" if not found.
+    Returns the name of the item as a String, or None if not found.
+    DB errors are logged and re-raised (a failed lookup is NOT a miss).
     """
     # Validation
     logger.debug(f"Starting lookup for item_id: {item_id}")
     if item_id is None or item_id < 0:
-        return "N/A"
+        return None
+    cached_name = _cached(_item_name_cache, item_id)
+    if cached_name is not None:
+        return cached_name
         
-    conn = None # Initialize for safety in finally block
-    sql = "SELECT ingredient_name FROM items WHERE ingredient_id = ?"
-    
     try:
-        conn = sqlite3.connect(database)
-        # Database Setup: Use Row Factory
-        conn.row_factory = sqlite3.Row
-        
+        conn = get_conn()
         cursor = conn.cursor()
-        sql_logger.info(f"Query: {sql} | Params: {(item_id,)}")
+        # Row Factory only on this cursor, the shared connection stays untouched
+        cursor.row_factory = sqlite3.Row
+        sql_logger.debug("Query: %s | Params: %s", SQL_GET_ITEM_NAME, (item_id,))
         
         # Execution
-        cursor.execute(sql, (item_id,))
+        cursor.execute(SQL_GET_ITEM_NAME, (item_id,))
         result = cursor.fetchone()
         
         # Result Handling
         if result:
             logger.debug(f"Found item: '{str(result['ingredient_name'])}' (ID: {item_id})")
+            _remember_item_committed(conn, item_id, str(result["ingredient_name"]))
             return str(result["ingredient_name"])
         else:
             logger.debug(f"Item ID {item_id} not found in DB.")
-            return "N/A"
+            return None
             
     except sqlite3.Error as e:
         logger.error(f"Database Error in get_item_name for ID {item_id}: {e}", exc_info=True)
-        return None
-    finally:
-        # Cleanup
-        if conn:
-            conn.close()
+        raise
 
-def get_item_id(item_name: str) -> int | str | None:
+def get_item_id(item_name: str) -> int | None:
     """
     Searches for an ingredient_id by name.
-    Returns the ID as an Integer if found, otherwise "N/A".
+    Returns the ID as an Integer if found, otherwise None.
+    DB errors are logged and re-raised (a failed lookup is NOT a miss).
     """
     logger.debug(f"Starting get_item_id for Name: {item_name}")
     
     # Validation
     if not item_name:
-        return "N/A"
+        return None
+    cached_id = _cached(_item_id_cache, item_name)
+    if cached_id is not None:
+        return cached_id
         
-    conn = None # Initialize for safety in finally block
-    sql = "SELECT ingredient_id FROM items WHERE ingredient_name = ?"
-    
     try:
-        conn = sqlite3.connect(database)
-        # Database Setup
-        conn.row_factory = sqlite3.Row 
-        
+        conn = get_conn()
         cursor = conn.cursor()
-        sql_logger.info(f"Query: {sql} | Params: {(item_name,)}")
+        cursor.row_factory = sqlite3.Row
+        sql_logger.debug("Query: %s | Params: %s", SQL_GET_ITEM_ID, (item_name,))
 
         # Execution
-        cursor.execute(sql, (item_name,))
+        cursor.execute(SQL_GET_ITEM_ID, (item_name,))
         result = cursor.fetchone()
         
         # Result Handling
         if result:
             # Return just the number
             logger.debug(f"Found ID {int(result['ingredient_id'])} for name '{item_name}'")
+            _remember_item_committed(conn, int(result['ingredient_id']), item_name)
             return int(result['ingredient_id'])
         else:
             logger.debug(f"No ID found for name '{item_name}'")
-            return "N/A"
+            return None
 
     except sqlite3.Error as e:
         logger.error(f"Database Error in get_item_id: {e}", exc_info=True)
-        return None
-        
-    finally:
-        # Cleanup
-        if conn:
-            conn.close()
+        raise
 
 def create_item(ingredient_name: str) -> bool:
     """
     Inserts a new ingredient into the database by name.
-    Checks for duplicates first.
+    Duplicates are skipped by ON CONFLICT DO NOTHING (UNIQUE index on ingredient_name), no pre-flight lookup needed.
     
     Args:
         ingredient_name (str): Name of the item to create.
@@ -128,32 +175,68 @@ def create_item(ingredient_name: str) -> bool:
         logger.warning("Attempted to create item with empty name.")
         return False
         
-    # Duplicate Check (Pre-Flight)
-    existing_id = get_item_id(ingredient_name)
-    if existing_id != "N/A": # if get_item_id returns a number, it exists.
-        logger.debug(f"Skipping creation: '{ingredient_name}' already exists (ID: {existing_id})")
-        return False 
-
-    conn = None # Initialize for safety in finally block
-    sql_insert = "INSERT INTO items (ingredient_name) VALUES (?)"
-
     try: 
-        conn = sqlite3.connect(database)
-        # Transaction Block
-        with conn:
+        conn = get_conn()
+        # Transaction Block (joins the caller's transaction if one is open, e.g. modify_pantry)
+        with transaction(conn):
             cursor = conn.cursor()
-            sql_logger.info(f"Query: {sql_insert} | Params: {(ingredient_name,)}")
-            cursor.execute(sql_insert, (ingredient_name,))
+            sql_logger.debug("Query: %s | Params: %s", SQL_CREATE_ITEM, (ingredient_name,))
+            cursor.execute(SQL_CREATE_ITEM, (ingredient_name,))
+            row = cursor.fetchone()
             
-            # Confirmation
-            new_id = cursor.lastrowid
-            logger.info(f"Successfully created Item '{ingredient_name}' (ID: {new_id})")
-            return True
+            # Confirmation (no row returned -> conflict, the name already exists)
+            if row is None:
+                logger.debug(f"Skipping creation: '{ingredient_name}' already exists")
+                return False
+            new_id = row[0]
+        # Write-through: the new item is known after the commit, no extra lookup needed.
+        # Still inside an outer transaction (e.g. modify_pantry) -> cached once that one commits.
+        _remember_item_committed(conn, new_id, ingredient_name)
+        logger.info(f"Successfully created Item '{ingredient_name}' (ID: {new_id})")
+        return True
             
     except sqlite3.Error as e:
         logger.error(f"Failed to create item '{ingredient_name}': {e}", exc_info=True)
-        return False 
-    finally:
-        # Cleanup
-        if conn:
-            conn.close()
\ No newline at end of file
+        return False
+
+def resolve_item_ids(item_names: list[str]) -> dict[str, int]:
+    """
+    Resolves a whole list of ingredient names to their IDs in ONE lookup query.
+    Names that don't exist yet are inserted in one batch (executemany) and selected again.
+    Used by create_recipe / update_recipe instead of get_item_id + create_item per ingredient.
+    The resolved pairs are cached once the caller's transaction commits.
+
+    Returns:
+        dict: { "ingredient name": ingredient_id } for every given name.
+    """
+    names = list(dict.fromkeys(item_names)) # remove duplicates, keep order
+    if not names:
+        return {}
+
+    placeholders = ",".join("?" * len(names))
+    sql_select = f"SELECT ingredient_name, ingredient_id FROM items WHERE ingredient_name IN ({placeholders})"
+    conn = get_conn()
+    # Joins the caller's transaction if one is open
+    with transaction(conn):
+        cursor = conn.cursor()
+        sql_logger.debug("Query: %s | Params: %s", sql_select, names)
+        cursor.execute(sql_select, names)
+        name_to_id = dict(cursor)
+
+        missing = [name for name in names if name not in name_to_id]
+        if missing:
+            logger.debug(f"Creating {len(missing)} missing ingredients: {missing}")
+            sql_logger.debug("Query: %s | Batch Size: %s", SQL_INSERT_ITEM, len(missing))
+            cursor.executemany(SQL_INSERT_ITEM, [(name,) for name in missing])
+
+            # Re-select only the new ones to get their IDs
+            placeholders = ",".join("?" * len(missing))
+            sql_new = f"SELECT ingredient_name, ingredient_id FROM items WHERE ingredient_name IN ({placeholders})"
+            sql_logger.debug("Query: %s | Params: %s", sql_new, missing)
+            cursor.execute(sql_new, missing)
+            name_to_id.update(cursor)
+
+        # Teach the cache - runs after the caller's COMMIT (create_recipe / update_recipe), dropped on rollback
+        resolved = dict(name_to_id) # snapshot, the caller may change the returned dict
+        on_commit(conn, lambda: _remember_items(resolved))
+    return name_to_id
@@ -11,13 +11,14 @@ Description:
     Key Features:
     - select_user_pantry: Retrieves inventory with joined ingredient names.
     - modify_pantry: A transactional function to Add/Remove items. 
-      Handles 'Upsert' logic (Update if exists, Insert if new) and 
+      Handles 'Upsert' logic in ONE statement (INSERT ... ON CONFLICT DO UPDATE) and 
       automatic cleanup (Delete row if amount <= 0).
 
 Dependencies:
     - sqlite3
     - pydantic_models.Item
     - item_helper
+    - db_conn (shared connection)
 --------------------------------------------------------------------------------
 """
 
@@ -25,9 +26,24 @@ Dependencies:
 import sqlite3
 from models.pydantic_models import Item, PantryAction
 from helper.db_item import *
+from helper.db_conn import get_conn, transaction
 from helper.logger import logger, sql_logger
 
-database = "cloudcookbook.db"
+# --- SQL STATEMENTS ---
+# Defined once at module level, so the identical string hits SQLite's statement cache on every call.
+SQL_GET_PANTRY = """
+        SELECT i.ingredient_name, p.amount 
+        FROM pantry p
+        JOIN items i ON p.ingredient_id = i.ingredient_id
+        WHERE p.uid = ?
+        """
+# Upsert: Insert new row, or add to the existing amount (uid + ingredient_id is the Primary Key)
+SQL_UPSERT_PANTRY = """
+        INSERT INTO pantry (amount, uid, ingredient_id) VALUES (?, ?, ?)
+        ON CONFLICT(uid, ingredient_id) DO UPDATE SET amount = pantry.amount + excluded.amount
+        """
+SQL_SUBTRACT_PANTRY = "UPDATE pantry SET amount = amount - ? WHERE uid = ? AND ingredient_id = ? RETURNING amount"
+SQL_DELETE_PANTRY_ITEM = "DELETE FROM pantry WHERE uid = ? AND ingredient_id = ?"
 
 def select_user_pantry(uid:int) -> dict:
     """
@@ -38,31 +54,21 @@ def select_user_pantry(uid:int) -> dict:
     # Validation: If no valid search criteria are given, stop immediately.
     if uid == -1:
         return None
-    conn = None # Initialize for safety in finally block
     try:
-        conn = sqlite3.connect(database)
-        conn.row_factory = sqlite3.Row  # This allows us to access data by column name (e.g., row['name'])
-        sql = """
-        SELECT i.ingredient_name, p.amount 
-        FROM pantry p
-        JOIN items i ON p.ingredient_id = i.ingredient_id
-        WHERE p.uid = ?
-        """
+        conn = get_conn()
         cursor = conn.cursor()
-        sql_logger.info(f"Query: {sql} | Params: {(uid,)}")
-        cursor.execute(sql, (uid,))
+        sql_logger.debug("Query: %s | Params: %s", SQL_GET_PANTRY, (uid,))
+        cursor.execute(SQL_GET_PANTRY, (uid,))
         rows = cursor.fetchall()
         if not rows:
             logger.debug(f"Pantry is empty for UID {uid}")
             return {}
         logger.debug(f"Retrieved {len(rows)} items for UID {uid}")
-        return {row['ingredient_name']: row['amount'] for row in rows}
+        # Rows are plain (ingredient_name, amount) tuples -> directly usable as dict items
+        return dict(rows)
     except sqlite3.Error as e:
             logger.error(f"Database Error in select_user_pantry: {e}", exc_info=True)
             return None
-    finally:
-        if conn:
-            conn.close()
 
 def modify_pantry(uid: int, ingredient_name: str, amount: int, action: PantryAction)-> bool:
     """
@@ -79,67 +85,47 @@ def modify_pantry(uid: int, ingredient_name: str, amount: int, action: PantryAct
         bool: True if the database operation was successful, False if validation failed or an error occurred.
     """
     logger.debug(f"Starting modify_pantry: User {uid} {action.value} {amount}x '{ingredient_name}'")
-    conn = None
     # Basic Validation
     if uid == -1 or not ingredient_name or amount <= 0:
         logger.warning(f"Validation failed for pantry modification (UID: {uid}, Item: {ingredient_name})")
         return False
     try:
-        conn = sqlite3.connect(database)
-        conn.row_factory = sqlite3.Row
-        with conn:
+        conn = get_conn()
+        with transaction(conn):
             cursor = conn.cursor()
             item_id = get_item_id(ingredient_name)
             
             # --- ADDITION LOGIC ---
             
             if action == PantryAction.ADD:
-                if item_id == "N/A":
+                if item_id is None:
                     create_item(ingredient_name)
-                    sql_check = "SELECT 1 FROM pantry WHERE uid=? AND ingredient_id=?"
                     item_id = get_item_id(ingredient_name)
-                    sql_logger.info(f"Query: {sql_check} | Params: {(uid, item_id)}")
-                cursor.execute(sql_check, (uid, item_id))
-                
-                exists = cursor.fetchone()
-                if exists:
-                    # Update: Add to existing
-                    sql = "UPDATE pantry SET amount = amount + ? WHERE uid = ? AND ingredient_id = ?"
-                    sql_logger.info(f"Query: {sql} | Params: {(uid, item_id)}")
-                    cursor.execute(sql, (amount, uid, item_id))
-                else:
-                    # Insert: New Row
-                    sql = "INSERT INTO pantry (amount, uid, ingredient_id) VALUES (?, ?, ?)"
-                    sql_logger.info(f"Query: {sql} | Params: {(uid, item_id)}")
-                    cursor.execute(sql, (amount, uid, item_id))
+                    if item_id is None: # creation failed -> never upsert a row with ingredient_id NULL
+                        logger.warning(f"Could not create item '{ingredient_name}' for User {uid}'s pantry.")
+                        return False
+                # Upsert: Insert new row, or add to the existing amount
+                sql_logger.debug("Query: %s | Params: %s", SQL_UPSERT_PANTRY, (amount, uid, item_id))
+                cursor.execute(SQL_UPSERT_PANTRY, (amount, uid, item_id))
             # --- REMOVAL LOGIC ---
             elif action == PantryAction.REMOVE:
-                if item_id == "N/A":
+                if item_id is None:
                     logger.warning(f"User {uid} tried to remove '{ingredient_name}', but it does not exist globally.")
                     return False # Can't remove an item that doesn't exist globally
-                cursor.execute("SELECT * FROM pantry WHERE uid=? AND ingredient_id=?", (uid, item_id))
-                exists = cursor.fetchone()
-                if exists: # Update: Subtract amount
-                    sql = "UPDATE pantry SET amount = amount - ? WHERE uid = ? AND ingredient_id = ?"
-                    sql_logger.info(f"Query: {sql} | Params: {(uid, item_id)}")
-                    cursor.execute(sql, (amount, uid, item_id))
-                    # Cleanup: Check if empty (<= 0) and Delete if so
-                    sql ="SELECT amount FROM pantry WHERE uid = ? AND ingredient_id = ?"
-                    sql_logger.info(f"Query: {sql} | Params: {(uid, item_id)}")
-                    cursor.execute(sql, (uid, item_id))
-                    row = cursor.fetchone()
-                    if row and row['amount'] <= 0:
-                        sql ="DELETE FROM pantry WHERE uid = ? AND ingredient_id = ?"
-                        sql_logger.info(f"Query: {sql} | Params: {(uid, item_id)}")
-                        cursor.execute(sql, (uid, item_id))
-                        logger.debug(f"Item {item_id} removed completely from User {uid}'s pantry.")
-                else: # tried to remove item not in user's pantry
+                # Update: Subtract amount and get the new amount back in the same statement
+                sql_logger.debug("Query: %s | Params: %s", SQL_SUBTRACT_PANTRY, (amount, uid, item_id))
+                cursor.execute(SQL_SUBTRACT_PANTRY, (amount, uid, item_id))
+                row = cursor.fetchone()
+                if row is None: # tried to remove item not in user's pantry
                     logger.warning(f"User {uid} tried to remove '{ingredient_name}' but does not have it.")
                     return False
+                # Cleanup: Delete if empty (<= 0)
+                if row[0] <= 0:
+                    sql_logger.debug("Query: %s | Params: %s", SQL_DELETE_PANTRY_ITEM, (uid, item_id))
+                    cursor.execute(SQL_DELETE_PANTRY_ITEM, (uid, item_id))
+                    logger.debug(f"Item {item_id} removed completely from User {uid}'s pantry.")
             logger.info(f"Pantry Update Success: User {uid} {action.value}ed {amount} of '{ingredient_name}'")
             return True
     except Exception as e:
         logger.error(f"Database Error in modify_pantry: {e}", exc_info=True)
         return False
-    finally:
-        if conn: conn.close()
@@ -10,45 +10,67 @@ Description:
     and converting between SQLite rows and Pydantic User objects.
 
 Key Features:
-    - create_user: Inserts a new user with automatic timestamp generation.
+    - create_user: Inserts a new user, the timestamp is generated by SQLite (DEFAULT CURRENT_TIMESTAMP).
     - get_user_by_id / get_user_by_name: Flexible retrieval methods.
-    - update_user: Dynamically updates only the changed fields (Partial Update),
+    - update_user: Updates only the changed fields (Partial Update, one fixed COALESCE statement),
       while protecting immutable fields like 'member_since'.
 
 Dependencies:
     - sqlite3
     - pydantic_models (User class)
-    - datetime
+    - db_conn (shared connection)
 --------------------------------------------------------------------------------
 """
 
 import sqlite3
 from models.pydantic_models import User
-from datetime import datetime
 from helper.logger import logger, sql_logger
+from helper.db_conn import get_conn, transaction
 
-database = "cloudcookbook.db"
+# --- SQL STATEMENTS ---
+# Defined once at module level, so the identical string hits SQLite's statement cache
+# (cached_statements on the pooled connection) on every call.
+SQL_INSERT_USER = """
+        INSERT INTO user ( active, username, member_since)
+        VALUES (?,?,?)
+        RETURNING uid
+    """
+# No date given -> SQLite fills member_since (DEFAULT CURRENT_TIMESTAMP), both values are read back in the same statement
+SQL_INSERT_USER_DEFAULT_DATE = """
+        INSERT INTO user ( active, username)
+        VALUES (?,?)
+        RETURNING uid, member_since
+    """
+SQL_GET_USER_BY_ID = "SELECT uid, active, username, member_since FROM user WHERE uid = ?"
+SQL_GET_USER_BY_NAME = "SELECT uid, active, username, member_since FROM user WHERE username = ?"
+
+# Partial update with ONE fixed statement: a NULL parameter keeps the old value (COALESCE).
+# 'uid' is the WHERE key, 'member_since' is immutable and therefore not part of the SET list.
+SQL_UPDATE_USER = """
+        UPDATE user
+           SET active   = COALESCE(?, active),
+               username = COALESCE(?, username)
+         WHERE uid = ?
+    """
+# Columns update_user is allowed to change (same order as the parameters of SQL_UPDATE_USER)
+UPDATABLE_USER_COLUMNS = ("active", "username")
 
 def create_user(user: User) -> User | None:
     """Inserts a new user into the 'users' table."""
     logger.debug(f"Starting create_user for: {user.username}")
-    conn = None # initialize for safety in finally block
-    if user.member_since is None: # set current date if 'member_since' is not provided
-        user.member_since = datetime.today().strftime('%d.%m.%Y')
 
-    sql_insert = """
-        INSERT INTO user ( active, username, member_since)
-        VALUES (?,?,?)
-    """
-    
     try:
-        conn = sqlite3.connect(database)
-        with conn: # automatically manages transaction commit/rollback
+        conn = get_conn()
+        with transaction(conn): # automatically manages transaction commit/rollback
             cursor = conn.cursor()
-            params = (user.active, user.username, user.member_since)
-            sql_logger.info(f"Query: {sql_insert} | Params: {params}")
-            cursor.execute(sql_insert, params)
-            user.uid = cursor.lastrowid
+            if user.member_since is None: # no date provided -> let the DB default set it
+                params = (user.active, user.username)
+                sql_logger.debug("Query: %s | Params: %s", SQL_INSERT_USER_DEFAULT_DATE, params)
+                user.uid, user.member_since = cursor.execute(SQL_INSERT_USER_DEFAULT_DATE, params).fetchone()
+            else:
+                params = (user.active, user.username, user.member_since)
+                sql_logger.debug("Query: %s | Params: %s", SQL_INSERT_USER, params)
+                user.uid = cursor.execute(SQL_INSERT_USER, params).fetchone()[0]
             logger.info(f"Successfully created User '{user.username}' (UID: {user.uid})")
             return user
 
@@ -57,102 +79,76 @@ def create_user(user: User) -> User | None:
         return None
 
     except sqlite3.Error as e:
-        logger.error(f"Database Error in create_user: {e}", exc_info=True)
+        logger.exception(f"Database Error in create_user: {e}") # unexpected -> full traceback
         return None
-    finally: # ensure the database connection is closed regardless of success/failure
-        conn.close()
 
 def get_user_by_id(uid: int) -> User | None:
     """Gets user by provided user id"""
     logger.debug(f"Starting get_user_by_id for UID: {uid}")
 
-    conn = None # initialize for safety in finally block
-    sql_select = "SELECT uid, active, username, member_since FROM user WHERE uid = ?"
-
     try:
-        conn = sqlite3.connect(database)
-        conn.row_factory = sqlite3.Row # allows accessing columns by name
-        with conn: # automatically manages transaction commit/rollback
-            cursor = conn.cursor()
-            sql_logger.info(f"Query: {sql_select} | Params: {(uid,)}")
-            cursor.execute(sql_select, (uid,))
-            row = cursor.fetchone()
+        conn = get_conn()
+        sql_logger.debug("Query: %s | Params: %s", SQL_GET_USER_BY_ID, (uid,))
+        row = conn.execute(SQL_GET_USER_BY_ID, (uid,)).fetchone() # plain tuple: (uid, active, username, member_since)
         
         if row:
             logger.debug(f"Found User for UID {uid}")
-            user_data = dict(row) # convert sqlite.Row object to a standard Python dictionary
-            return User(**user_data) # instantiate Pydantic model from dictionary data
+            # Trusted DB data -> skip Pydantic validation (model_construct)
+            return User.model_construct(uid=row[0], active=row[1], username=row[2], member_since=row[3])
         else:
             logger.debug(f"No User found for UID {uid}")
             return None
     except sqlite3.Error as e: 
-        logger.error(f"Error fetching user {uid}: {e}", exc_info=True)
+        logger.error(f"Error fetching user {uid}: {e}") # PK read: no traceback needed
         return None
-    finally: # ensure the database connection is closed regardless of success/failure
-        if conn:
-            conn.close()
 
 def get_user_by_name(username: str) -> User | None:
     """Gets a user by provided username."""
     logger.debug(f"Starting get_user_by_name for: {username}")
-    sql_select = "SELECT uid, active, username, member_since FROM user WHERE username = ?"
 
     try:
-        conn = sqlite3.connect(database)
-        conn.row_factory = sqlite3.Row # allows accessing columns by name
-        with conn: #automatically manages transaction commit/rollback
-            cursor = conn.cursor()
-            sql_logger.info(f"Query: {sql_select} | Params: {(username,)}")
-            cursor.execute(sql_select, (username,))
-            row = cursor.fetchone()
+        conn = get_conn()
+        sql_logger.debug("Query: %s | Params: %s", SQL_GET_USER_BY_NAME, (username,))
+        row = conn.execute(SQL_GET_USER_BY_NAME, (username,)).fetchone() # plain tuple: (uid, active, username, member_since)
 
         if row:
             logger.debug(f"Found User for username '{username}'")
-            user_data = dict(row) # convert sqlite.Row object to a standard Python dictionary
-            return User(**user_data) # instantiate Pydantic model from dictionary data
+            # Trusted DB data -> skip Pydantic validation (model_construct)
+            return User.model_construct(uid=row[0], active=row[1], username=row[2], member_since=row[3])
         else:
             logger.debug(f"No User found for username '{username}'")
             return None
 
     except sqlite3.Error as e:
-        logger.error(f"Error fetching username '{username}': {e}", exc_info=True)
+        logger.error(f"Error fetching username '{username}': {e}")
         return None
-    finally: # ensure the database connection is closed regardless of success/failure
-        if conn:
-            conn.close()
 
 def update_user(user: User) -> User | None:
     """Updates the data of existing users."""
     logger.debug(f"Starting update_user for UID: {user.uid}")
-    changes = user.model_dump(exclude_none=True) # extract only fields that are NOT None and NOT 'uid'/'member_since'
-    uid = changes.pop('uid', None) # remove fields designated for the WHERE clause and exclusions
-    changes.pop('member_since', None) # the 'member_since' field must NOT be updated
+    uid = user.uid
+    # extract only the allowed fields that are NOT None (allowlist)
+    changes = user.model_dump(include=set(UPDATABLE_USER_COLUMNS), exclude_none=True)
     if not uid or not changes:
         logger.warning(f"Update aborted for User {uid}: No valid changes provided.")
         return None
-    keys = changes.keys() # get keys to dynamically build the SET part of the query
-    set_statements = ", ".join([f"{key} = ?" for key in keys]) 
-    sql_update = f"UPDATE user SET {set_statements} WHERE uid = ?"
-    params = list(changes.values())
-    params.append(uid) # add the UID to the end of parameters for the WHERE clause
+    # missing fields -> None -> COALESCE keeps the current value; UID last for the WHERE clause
+    params = (changes.get("active"), changes.get("username"), uid)
 
     try:
-        conn = sqlite3.connect(database)
-        with conn: # automatically manages transaction commit/rollback
+        conn = get_conn()
+        with transaction(conn): # automatically manages transaction commit/rollback
             cursor = conn.cursor()
-            sql_logger.info(f"Query: {sql_update} | Params: {params}")
-            cursor.execute(sql_update, tuple(params)) 
+            sql_logger.debug("Query: %s | Params: %s", SQL_UPDATE_USER, params)
+            cursor.execute(SQL_UPDATE_USER, params)
             
             if cursor.rowcount == 0: # check if any rows were affected
                 logger.warning(f"Update failed: User with UID {uid} not found.")
                 return None
             
-            logger.info(f"Successfully updated User {uid}. Fields: {list(keys)}")
+            logger.info(f"Successfully updated User {uid}. Fields: {list(changes)}")
             return user 
 
     except sqlite3.Error as e:
-        logger.error(f"Database Error in update_user: {e}", exc_info=True)
+        logger.exception(f"Database Error in update_user: {e}") # unexpected -> full traceback
         return None
-    finally: # ensure the database connection is closed regardless of success/failure
-        if conn:
-            conn.close()
\ No newline at end of file
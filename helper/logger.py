@@ -2,20 +2,54 @@
 --------------------------------------------------------------------------------
 Script Name:   logger.py
 Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
-Last Updated:  2025-12-16
+Last Updated:  2026-10-15
 Description:   Centralized Logging.
-               Creates a 'logs/' directory and saves output there.
+               Creates a 'logs/' directory and saves output there
+               (size-capped, rotating files; set up once per process).
 --------------------------------------------------------------------------------
 """
 import logging
+import logging.handlers
+import atexit
+import queue
 import sys
 import os
 
-# --- 0. SETUP LOG DIRECTORY ---
 LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
-    print(f"Created logging directory: {LOG_DIR}")
+# Log files are rotated at LOG_MAX_BYTES (keeps LOG_BACKUP_COUNT old files: x.log.1, x.log.2, ...)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# --- QUEUED FILE HANDLERS ---
+# Disk writes are moved to a background thread: the logger only puts the record into a queue,
+# a QueueListener does the actual write(). Every file handler gets its OWN queue + listener,
+# otherwise e.g. app records would also end up in sql_audit.log.
+_listeners: list[logging.handlers.QueueListener] = []
+
+def _queued(handler: logging.Handler) -> logging.handlers.QueueHandler:
+    """Wraps a (file) handler behind a QueueHandler and starts its background listener."""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setLevel(handler.level)  # Filtered records don't even reach the queue
+    return queue_handler
+
+@atexit.register
+def _stop_listeners() -> None:
+    """Flushes the remaining queued records to disk on shutdown."""
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+def _file_handler(file_name: str, formatter: logging.Formatter) -> logging.Handler:
+    """Size-capped log file in LOG_DIR. delay=True -> the file is only opened on the first write."""
+    handler = logging.handlers.RotatingFileHandler(
+        os.path.join(LOG_DIR, file_name), mode='a', maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True)
+    handler.setFormatter(formatter)
+    return handler
 
 
 # --- 1. MAIN APPLICATION LOGGER ---
@@ -29,61 +63,58 @@ logger.setLevel(logging.DEBUG) # Capture everything from Debug upwards
 # %(module)s: Tells which file
 standard_formatter = logging.Formatter('%(asctime)s | %(levelname)-8s | %(module)s.%(funcName)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 sql_formatter = logging.Formatter('%(asctime)s | SQL_TRACE | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+# API: Timestamp | METHOD | PATH | STATUS | DURATION
 api_formatter = logging.Formatter('%(asctime)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
-# Create The File Handler
-# mode='a' (Append): Add to the bottom of the file.
-# setLevel(logging.INFO): This is a Filter."Ignore the noisy DEBUG stuff. Only save important events"
-log_file_path = os.path.join(LOG_DIR, "cloud_cookbook.log")
-file_handler = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
-file_handler.setFormatter(standard_formatter)
-file_handler.setLevel(logging.INFO)
-
-# Create The Console Handler
-# sys.stdout: Terminal Window
-# setLevel(logging.DEBUG): This allows everything through.
-
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(standard_formatter)
-console_handler.setLevel(logging.DEBUG)
-
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
-
 # --- 2. SQL AUDIT LOGGER ---
 # This logger exists ONLY to write raw SQL commands to a separate file
+# Queries are logged on DEBUG level. In production set SQL_LOG_LEVEL=WARNING to switch the audit off,
+# the (lazy) log calls then cost almost nothing because the message is never formatted.
 sql_logger = logging.getLogger("SQL_Tracer")
-sql_logger.setLevel(logging.INFO)
-# SQL File Handler
-sql_file_path = os.path.join(LOG_DIR, "sql_audit.log")
-sql_handler = logging.FileHandler(sql_file_path, mode='a', encoding='utf-8')
-sql_handler.setFormatter(sql_formatter)
-sql_logger.addHandler(sql_handler)
+sql_logger.setLevel(os.getenv("SQL_LOG_LEVEL", "DEBUG").upper())
 
 # --- 3. API AUDIT LOGGER ---
-# This logger exists ONLY to write raw SQL commands to a separate file
-api_logger = logging.getLogger("API_Access")
-api_logger.setLevel(logging.INFO)
-
 # Tracks every incoming HTTP request, status code, and processing time
 api_logger = logging.getLogger("API_Access")
 api_logger.setLevel(logging.INFO)
 
-# Formatter: Timestamp | METHOD | PATH | STATUS | DURATION
-api_formatter = logging.Formatter('%(asctime)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-# File Handler
-api_file_path = os.path.join(LOG_DIR, "api_access.log")
-api_handler = logging.FileHandler(api_file_path, mode='a', encoding='utf-8')
-api_handler.setFormatter(api_formatter)
-api_logger.addHandler(api_handler)
+def _configure() -> None:
+    """
+    Creates the log directory and attaches all handlers.
+    Runs only ONCE per process (see guard below): a re-import/reload must not attach
+    a second set of handlers -> every record would be written twice.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    # App File Handler
+    # setLevel(logging.INFO): This is a Filter."Ignore the noisy DEBUG stuff. Only save important events"
+    file_handler = _file_handler("cloud_cookbook.log", standard_formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(_queued(file_handler))
+
+    # Console Handler
+    # sys.stdout: Terminal Window
+    # setLevel(logging.DEBUG): This allows everything through.
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(standard_formatter)
+    console_handler.setLevel(logging.DEBUG)
+    logger.addHandler(console_handler)
+
+    # SQL File Handler
+    sql_logger.addHandler(_queued(_file_handler("sql_audit.log", sql_formatter)))
+
+    # API File Handler
+    api_logger.addHandler(_queued(_file_handler("api_access.log", api_formatter)))
+
+if not logger.handlers:
+    _configure()
 
 # Usage:
 # from logger_config import logger, sql_logger, api_logger
 
 """Usage in Functions:
-Logging SQL Query's before the EXECUTE:
-->sql_logger.info(f"Query: {sql_string} | Params: {params}")
+Logging SQL Query's before the EXECUTE (lazy %-formatting, only formatted if the record is written):
+->sql_logger.debug("Query: %s | Params: %s", sql_string, params)
 
 Debug Data for what was done:
 -> logger.debug(f"Fetching data for ID: {id}") 
@@ -14,25 +14,27 @@ Description:
 --------------------------------------------------------------------------------
 """
 from contextlib import asynccontextmanager
+import logging
 import time
 import os
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from sql_setup.db_init import init_db
-from sql_setup.db_setup import create_database
-from models.pydantic_models import User, Recipe, RecipeSummary, ItemCreateRequest, PantryModifyRequest, PantryAction
+from sql_setup.db_setup import create_database, create_indexes, normalize_recipe_text
+from models.pydantic_models import User, Recipe, RecipeOut, RecipeSummary, ItemCreateRequest, PantryModifyRequest, PantryAction
 from helper.db_recipe import create_recipe, get_recipe, get_all_recipes_summary, update_recipe, get_recipe_ingredients
 from helper.db_item import get_item_name, get_item_id, create_item
 from helper.db_pantry import select_user_pantry, modify_pantry
 from helper.db_user import create_user, get_user_by_id, get_user_by_name, update_user
 from helper.logger import api_logger, logger
 from helper.actionhelper import get_cookable_recipes, cook_recipe
-
-# Database file name
-DB_FILE = "cloudcookbook.db"
+from helper.db_conn import init_pool, close_pool, DB_FILE
+# Maximum number of recipes returned by GET /recipes if no limit is given
+RECIPE_LIST_LIMIT = 500
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- STARTUP LOGIC ---
+    # (COOKBOOK_DB=":memory:" points to a new, empty temp file -> fresh schema + seed on every start)
     if not os.path.exists(DB_FILE):
         logger.warning(f"Database '{DB_FILE}' not found. Creating and Seeding...")
         try:
@@ -47,8 +49,21 @@ async def lifespan(app: FastAPI):
             logger.error(f"Failed to initialize database: {e}")
     else:
         logger.info(f"Database '{DB_FILE}' found. Skipping initialization.")
+        # Older DB files may miss indexes that were added later
+        try:
+            create_indexes()
+        except Exception as e:
+            logger.error(f"Failed to create indexes: {e}")
+        # Older DB files may still contain mixed-case recipe names / steps
+        try:
+            normalize_recipe_text()
+        except Exception as e:
+            logger.error(f"Failed to normalize recipe text: {e}")
+    # Open the shared connection once (after the DB file is guaranteed to exist)
+    init_pool()
     yield
     logger.info("Server shutting down...")
+    close_pool()
 
 
 # Define API Metadata
@@ -90,23 +105,26 @@ async def log_api_calls(request: Request, call_next):
     """
     Middleware that intercepts every request to log traffic data.
     """
-    start_time = time.time()
+    start = time.perf_counter_ns() # monotonic clock, not affected by NTP adjustments
     response = await call_next(request)
-    process_time = (time.time() - start_time) * 1000
+    process_ms = (time.perf_counter_ns() - start) / 1_000_000
     
-    # Log: METHOD path - Status - IP - Duration
-    log_message = f"{request.method} {request.url.path} - {response.status_code} - {request.client.host} - {process_time:.2f}ms"
-    api_logger.info(log_message)
+    # Log: METHOD path - Status - IP - Duration (only formatted if the API log is enabled)
+    if api_logger.isEnabledFor(logging.INFO):
+        api_logger.info("%s %s - %s - %s - %.2fms", request.method, request.url.path, response.status_code, request.client.host, process_ms)
     
     return response
 
+# Every endpoint declares a response_model -> FastAPI serializes the returned data
+# directly to JSON bytes via Pydantic (no extra jsonable_encoder pass).
+
 # ITEM ENDPOINTS 
 
 @app.get("/items/{item_id}", response_model=str, tags=["Items"])
 def read_item_name(item_id: int):
     """Gets the ingredient name by the provided item_id."""
     name = get_item_name(item_id)
-    if name == "N/A" or None:
+    if name is None:
         raise HTTPException(status_code=404, detail="Item not found.")
     return str(name)
 
@@ -114,21 +132,21 @@ def read_item_name(item_id: int):
 def read_item_id(name: str):
     """Gets item_id by the provided ingredient name"""
     item_id = get_item_id(name)
-    if item_id == "N/A":
+    if item_id is None:
         raise HTTPException(status_code=404, detail="Item not found.")
     return item_id
 
-@app.post("/items", status_code=201, tags=["Items"])
+@app.post("/items", response_model=dict[str, str], status_code=201, tags=["Items"])
 def create_new_item(item_data: ItemCreateRequest):
     """Creates new item in database"""
     success = create_item(item_data.ingredient_name)
     if not success:
-        raise HTTPException(status_code=400, details="Items already exists or invalid input.")
+        raise HTTPException(status_code=400, detail="Items already exists or invalid input.")
     return {"message": f"Item '{item_data.ingredient_name}' created successfully."}
 
 # PANTRY ENDPOINTS
 
-@app.get("/pantry/{uid}", tags=["Pantry"])
+@app.get("/pantry/{uid}", response_model=dict[str, int], tags=["Pantry"])
 def get_pantry(uid:int):
     """Gets data from user's panrty"""
     pantry = select_user_pantry(uid)
@@ -136,7 +154,7 @@ def get_pantry(uid:int):
         raise HTTPException(status_code=404, detail="User not found.")
     return pantry
 
-@app.post("/pantry/{uid}",status_code=201, tags=["Pantry"])
+@app.post("/pantry/{uid}", response_model=dict[str, str], status_code=201, tags=["Pantry"])
 def update_pantry(uid: int, request: PantryModifyRequest):
     """Updates data in the user's pantry."""
     success = modify_pantry(
@@ -171,7 +189,7 @@ def add_recipe(recipe:Recipe):
         raise HTTPException(status_code=400, detail="Could not create recipe.")
     return {"message": "Recipe created", "recipe_id": result}
 
-@app.get("/recipes/{recipe_id}", response_model=Recipe, tags=["Recipes"])
+@app.get("/recipes/{recipe_id}", response_model=RecipeOut, tags=["Recipes"])
 def get_single_recipe(recipe_id: int):
     """Gets the recipe by the provided item ID."""
     recipe=get_recipe(recipe_id)
@@ -180,23 +198,18 @@ def get_single_recipe(recipe_id: int):
     return recipe
 
 @app.get("/recipes", response_model=list[RecipeSummary], tags=["Recipes"])
-def get_all_recipes(limit: int | None = None): 
+def get_all_recipes(limit: int | None = Query(None, ge=1, le=RECIPE_LIST_LIMIT)):
     """
-    Retrieves stored recipes.
+    Retrieves stored recipes (at most RECIPE_LIST_LIMIT).
     Optional Query Parameter:
-    ?limit=10 -> Returns only the first 10 recipes.
+    ?limit=10 -> Returns only the first 10 recipes (1 to RECIPE_LIST_LIMIT, anything else -> 422).
     """
-    recipes = get_all_recipes_summary()
-    
-    # Logic to handle the query parameter
-    if limit:
-        return recipes[:limit]
-    
-    return recipes
+    # The limit is passed down into the SQL query (bounded above, so SQLite never sees LIMIT -1 = unlimited)
+    return get_all_recipes_summary(limit=limit or RECIPE_LIST_LIMIT)
 
 
 
-@app.put("/recipes/{recipe_id}", response_model=Recipe, tags=["Recipes"])
+@app.put("/recipes/{recipe_id}", response_model=RecipeOut, tags=["Recipes"])
 def update_existing_recipe(recipe_id: int, updated_recipe: Recipe):
     """Updates a specific existing recipe."""
     updated_recipe.recipe_id = recipe_id
@@ -250,7 +263,7 @@ def find_cookable(uid: int):
     """
     return get_cookable_recipes(uid)
 
-@app.post("/cook/{uid}/{recipe_id}", tags=["Matchmaking"])
+@app.post("/cook/{uid}/{recipe_id}", response_model=dict[str, str], tags=["Matchmaking"])
 def cook_recipe_endpoint(uid: int, recipe_id: int):
     """
     Attempts to cook a recipe.
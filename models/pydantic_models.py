@@ -16,18 +16,60 @@ Key Features:
     - Core Models: Defines standard entities like 'User', 'Recipe', and 'Item'.
     - DTOs: Specialized models for specific API requests (e.g., 'ItemCreateRequest')
       or summarized list views (e.g., 'RecipeSummary').
+    - Response Models: '*Out' / summary models carry NO validators. Data coming from the
+      DB was already cleaned on write, so responses don't pay for the lowercase coercion again.
     - Enums: Standardizes fixed choices like 'PantryAction' (ADD/REMOVE).
-    - Validation: Enforces constraints (e.g., time_needed > 0, max lengths) as well as enforcement of lowercase.
+    - Validation: Enforces constraints (e.g., time_needed > 0, max lengths) as well as enforcement of lowercase
+      (one shared 'LowerStr' type instead of a validator per model).
 
 Dependencies:
-    - pydantic (BaseModel, Field)
+    - pydantic (BaseModel, Field, BeforeValidator)
+    - typing (Annotated)
     - enum
 --------------------------------------------------------------------------------
 """
 
-from pydantic import BaseModel, Field, field_validator
+from typing import Annotated
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, field_validator
 from enum import Enum
 
+# --- SHARED CLEANING FUNCTIONS ---
+# Defined once and reused by every model that needs them (instead of one copy per class).
+# Non-matching types are passed through unchanged, so Pydantic's normal validation reports them.
+
+def lower_strip(value):
+    """Lowercases and strips a single string."""
+    if isinstance(value, str):
+        return value.lower().strip()
+    return value
+
+# For the list/dict cleaners below: str methods bound once (no attribute lookup per element)
+# and 'type(x) is str' instead of isinstance() (JSON input never contains str subclasses).
+_lower = str.lower
+_strip = str.strip
+
+def lower_strip_list(value):
+    """Lowercases and strips every string in a list (non-strings are dropped)."""
+    if type(value) is list:
+        return [_strip(_lower(item)) for item in value if type(item) is str]
+    return value
+
+def lower_strip_dict_keys(value):
+    """Lowercases and strips every key of a dict, values are kept (non-string keys are dropped)."""
+    if type(value) is dict:
+        return {_strip(_lower(k)): v for k, v in value.items() if type(k) is str}
+    return value
+
+# Reusable string type: lowercased + stripped BEFORE the normal str validation (min/max length etc.)
+LowerStr = Annotated[str, BeforeValidator(lower_strip)]
+
+# Recipes without a creator belong to the default user (uid 1)
+DEFAULT_RECIPE_CREATOR = 1
+
+def default_creator(value):
+    """Maps an explicit null creator to DEFAULT_RECIPE_CREATOR."""
+    return DEFAULT_RECIPE_CREATOR if value is None else value
+
 class PantryAction(str, Enum):
     ADD = "add"
     REMOVE = "remove"
@@ -46,45 +88,25 @@ class User(BaseModel):
 class Item(BaseModel):
     # -1 means NOT SET
     ingredient_id: int | None = -1
-    ingredient_name: str = Field(..., min_length=3, max_length=30, examples=["Rice"])
-    
-    @field_validator('ingredient_name', mode='before')
-    @classmethod
-    def enforce_lowercase(cls, value: str) -> str:
-        if isinstance(value, str):
-            return value.lower().strip()
-        return value
+    ingredient_name: LowerStr = Field(..., min_length=3, max_length=30, examples=["Rice"])
 
 
 class ItemCreateRequest(BaseModel):
     """Specific model for POST /items requests"""
-    ingredient_name: str
-
-    @field_validator('ingredient_name', mode='before')
-    @classmethod
-    def enforce_lowercase(cls, value: str) -> str:
-        if isinstance(value, str):
-            return value.lower().strip()
-        return value
+    ingredient_name: LowerStr
 
 # --- PANTRY MODELS ---
 
 class PantryModifyRequest(BaseModel):
     """Specific model for pantry requests"""
-    ingredient_name: str
+    ingredient_name: LowerStr
     amount: int = Field(..., gt=0, examples=[500])
     action: PantryAction
 
-    @field_validator('ingredient_name', mode='before')
-    @classmethod
-    def enforce_lowercase(cls, value: str) -> str:
-        if isinstance(value, str):
-            return value.lower().strip()
-        return value
-
 # --- RECIPE MODELS ---
 
-class Recipe(BaseModel):
+class RecipeBase(BaseModel):
+    """Shared Recipe fields (no validators)"""
     recipe_id: int | None = None
     recipe_name:str = Field(...,min_length=3,max_length=50,examples=["Mushroom Stew"])
     description: str = Field(..., max_length=200, examples=["Ein deftiger Eintopf für kalte Tage."])
@@ -95,43 +117,28 @@ class Recipe(BaseModel):
     recipe_ingredients: dict[str, int] = Field(..., examples=[{"fish fillet": 5, "rice": 100}])
     instructions: list[str] = Field(..., examples=[["Slice the vegetables", "Boil water"]])
 
-    # 1. CLEAN THE RECIPE NAME
-    @field_validator('recipe_name', mode='before')
-    @classmethod
-    def clean_name(cls, value: str) -> str:
-        if isinstance(value, str):
-            return value.lower().strip()
-        return value
+class Recipe(RecipeBase):
+    """Model for incoming recipe requests (POST/PUT), cleans all user input"""
 
+    # 1. CLEAN THE RECIPE NAME (same constraints as RecipeBase, only the type is swapped)
+    recipe_name: LowerStr = Field(...,min_length=3,max_length=50,examples=["Mushroom Stew"])
+    # Missing OR null creator -> default user (uid 1), so the DB layer always gets an int
+    recipe_creator: Annotated[int, BeforeValidator(default_creator)] = Field(default=DEFAULT_RECIPE_CREATOR)
     # 2. CLEAN THE INSTRUCTIONS
-    @field_validator('instructions', mode='before')
-    @classmethod
-    def clean_instruction_list(cls, value: list) -> list:
-        if isinstance(value, list):
-            # Apply logic to every string in the list
-            return [item.lower().strip() for item in value if isinstance(item, str)]
-        return value
-    
-    # 3. CLEAN THE INGREDIENTS
-    @field_validator('recipe_ingredients', mode='before')
-    @classmethod
-    def clean_ingredient_keys(cls, value: dict) -> dict:
-        if isinstance(value, dict):
-            # Clean Key (k), keep Value (v)
-            return {k.lower().strip(): v for k, v in value.items() if isinstance(k, str)}
-        return value
+    clean_instruction_list = field_validator('instructions', mode='before')(lower_strip_list)
+    # 3. CLEAN THE INGREDIENTS (Clean Key, keep Value)
+    clean_ingredient_keys = field_validator('recipe_ingredients', mode='before')(lower_strip_dict_keys)
+
+class RecipeOut(RecipeBase):
+    """Response model for recipes read from the DB (already cleaned -> no validators)"""
+    model_config = ConfigDict(from_attributes=True)
 
 class RecipeSummary(BaseModel):
     """Lighter model for Lists/Dashboards (No heavy ingredients/steps)"""
+    model_config = ConfigDict(from_attributes=True)
+
     recipe_id: int
     recipe_name: str
     description: str | None = None
     recipe_creator: int | None = None
-    time_needed: int
-    
-    @field_validator('recipe_name', mode='before')
-    @classmethod
-    def enforce_lowercase(cls, value: str) -> str:
-        if isinstance(value, str):
-            return value.lower().strip() 
-        return value
\ No newline at end of file
+    time_needed: int
\ No newline at end of file
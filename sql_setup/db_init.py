@@ -13,24 +13,43 @@ Usage:         Run once during deployment or setup:
 --------------------------------------------------------------------------------
 """
 import sqlite3
+import sys
 from helper.logger import logger, sql_logger
+from helper.db_conn import connect
+from sql_setup.db_setup import create_indexes
 
-DB_FILE = "cloudcookbook.db"
+# Plain lookup indexes (see db_setup.INDEX_STATEMENTS) that are dropped during the bulk load
+# and rebuilt once afterwards (create_indexes), instead of updating their B-trees row by row.
+# idx_items_name stays: INSERT OR IGNORE in init_ingredients needs it to skip duplicates.
+SEED_DEFERRED_INDEXES = ("idx_ri_recipe", "idx_pantry_uid_ing", "idx_steps_recipe")
+
+# Console output of the seeder is collected here and written in ONE write() at the end of init_db
+# (instead of one print() syscall per message).
+_seed_output: list[str] = []
+
+def report(message: str):
+    """Queues a console message of the seeder (replaces print)."""
+    _seed_output.append(message)
+
+def flush_report():
+    """Writes all queued messages to stdout at once."""
+    if _seed_output:
+        sys.stdout.write("\n".join(_seed_output) + "\n")
+        sys.stdout.flush()
+        _seed_output.clear()
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    # WAL, synchronous=NORMAL, foreign_keys etc. are applied inside connect()
+    return connect()
 
 # ---------------------------------------------------------
 # 1. INIT USERS
 # ---------------------------------------------------------
-def init_users():
+def init_users(conn):
     """Creates the 4 standard users."""
-    conn = get_db_connection()
     cursor = conn.cursor()
     
-    print("--- Initializing Users ---")
+    report("--- Initializing Users ---")
     # SQLite handles IDs (1, 2, 3...) automatically via AUTOINCREMENT
     users = [
         ("ADMIN",), 
@@ -41,21 +60,18 @@ def init_users():
 # INSERT OR IGNORE avoids crashes if users already exist
     sql = "INSERT OR IGNORE INTO user (username) VALUES (?)"
     cursor.executemany(sql, users)
-    sql_logger.info(f"Query: {sql} | Params: {(users,)}")
-    conn.commit()
-    conn.close()
-    print("Users created.")
+    sql_logger.debug("Query: %s | Params: %s", sql, (users,))
+    report("Users created.")
     logger.info("Users created.")
 
 # ---------------------------------------------------------
 # 2. INIT INGREDIENTS
 # ---------------------------------------------------------
-def init_ingredients():
+def init_ingredients(conn):
     """Creates the Top 100 English Ingredients."""
-    conn = get_db_connection()
     cursor = conn.cursor()
     
-    print("--- Initializing Ingredients ---")
+    report("--- Initializing Ingredients ---")
 
     item_list_names = [
         # Dairy & Eggs
@@ -99,48 +115,35 @@ def init_ingredients():
     # Tuple format for executemany
     data_to_insert = [(name.lower(),) for name in unique_items]
     
-    # Safer loop to avoid duplicates:
-    count = 0
-    for item in data_to_insert:
-        # Check if exists
-        sql = "INSERT INTO items (ingredient_name) VALUES (?)"
-        sql2="SELECT 1 FROM items WHERE ingredient_name = ?"
-        sql_logger.info(f"Query: {sql2} | Params: {(item,)}")
-        cursor.execute(sql2, item)
-        if not cursor.fetchone():
-            cursor.execute(sql, item)
-            sql_logger.info(f"Query: {sql} | Params: {(item,)}")
-
-            count += 1
+    # One batch insert (instead of SELECT + INSERT per item).
+    # Duplicates are skipped by the UNIQUE index on ingredient_name (INSERT OR IGNORE).
+    sql = "INSERT OR IGNORE INTO items (ingredient_name) VALUES (?)"
+    sql_logger.debug("Query: %s | Batch Size: %s", sql, len(data_to_insert))
+    cursor.executemany(sql, data_to_insert)
+    count = cursor.rowcount # rows actually inserted (ignored ones don't count)
 
-    conn.commit()
-    conn.close()
-    print(f"Ingredients initialized. Added {count} new items.")
+    report(f"Ingredients initialized. Added {count} new items.")
     logger.info(f"Ingredients initialized. Added {count} new items.")
 
 
 # ---------------------------------------------------------
 # 3. INIT RECIPES (Real Recipes)
 # ---------------------------------------------------------
-def init_recipes():
+def init_recipes(conn):
     """Creates 4 real recipes with dynamic ID lookup."""
-    conn = get_db_connection()
     cursor = conn.cursor()
     
-    print("--- Initializing Recipes ---")
+    report("--- Initializing Recipes ---")
 
-# Helper: Find Ingredient ID by Name
-    def get_ing_id(name):
-        sql = "SELECT ingredient_id FROM items WHERE ingredient_name = ?"
-        cursor.execute(sql, (name.lower(),))
-        sql_logger.info(f"Query: {sql} | Params: {(name.lower(),)}")
+    # Name -> ID map of ALL items, loaded once (instead of one SELECT per ingredient)
+    ing_map = dict(cursor.execute("SELECT ingredient_name, ingredient_id FROM items"))
 
-        result = cursor.fetchone()
-        if result:
-            return result[0]
-        print(f"WARNING: Ingredient '{name}' not found in DB! Skipping.")
-        logger.info(f"WARNING: Ingredient '{name}' not found in DB! Skipping.")
-        return None
+    def get_ing_id(name):
+        ing_id = ing_map.get(name.lower())
+        if ing_id is None:
+            report(f"WARNING: Ingredient '{name}' not found in DB! Skipping.")
+            logger.info(f"WARNING: Ingredient '{name}' not found in DB! Skipping.")
+        return ing_id
     
     real_recipes = [
         {
@@ -226,46 +229,47 @@ def init_recipes():
             ]
         }
     ]
+    # Child rows of ALL recipes are collected first and inserted in two batches at the end
+    steps_params = []
+    ing_params = []
+    sql_recipe = "INSERT INTO recipe (recipe_name, description, recipe_creator, time_needed) VALUES (?, ?, ?, ?)"
+    sql_step = "INSERT INTO recipe_steps (recipe_id, step_number, instruction) VALUES (?, ?, ?)"
+    sql_ing = "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, needed) VALUES (?, ?, ?)"
+
+    # Runs inside the one seeding transaction of init_db (commit at the end, rollback on error)
     for recipe in real_recipes:
         # 1. Create Recipe Header
         # We DO NOT pass 'recipe_id' here. SQLite generates it (Auto Increment).
-        sql = "INSERT INTO recipe (recipe_name, description, recipe_creator, time_needed) VALUES (?, ?, ?, ?)"
-        cursor.execute(
-            sql,
-            (recipe["name"], recipe["desc"], recipe["creator"], recipe["time"])
-        )
-        sql_logger.info(f"Query: {sql} | Params: {(recipe["name"], recipe["desc"], recipe["creator"], recipe["time"])}")
+        # Names and steps are stored lowercase, same as the API (pydantic_models.Recipe) does on write.
+        recipe_name = recipe["name"].lower().strip()
+        params = (recipe_name, recipe["desc"], recipe["creator"], recipe["time"])
+        sql_logger.debug("Query: %s | Params: %s", sql_recipe, params)
+        cursor.execute(sql_recipe, params)
         
         # Capture the ID that SQLite just generated for us
         new_recipe_id = cursor.lastrowid
         
-        # 2. Add Steps (Linked to new_recipe_id)
-        for idx, instruction in enumerate(recipe["steps"]):
-            sql2 ="INSERT INTO recipe_steps (recipe_id, step_number, instruction) VALUES (?, ?, ?)"
-            cursor.execute(
-                sql2,
-                (new_recipe_id, idx + 1, instruction)
-            )
-            sql_logger.info(f"Query: {sql2} | Params: {(new_recipe_id, idx + 1, instruction)}")
+        # 2. Collect Steps (Linked to new_recipe_id)
+        steps_params += [
+            (new_recipe_id, step_number, instruction.lower().strip())
+            for step_number, instruction in enumerate(recipe["steps"], start=1)
+        ]
             
-        # 3. Add Ingredients (Linked to new_recipe_id)
+        # 3. Collect Ingredients (Linked to new_recipe_id)
         for ing_name, amount in recipe["ingredients"].items():
             ing_id = get_ing_id(ing_name)
             if ing_id:
-                sql = "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, needed) VALUES (?, ?, ?)"
-                cursor.execute(
-                    sql,
-                    (new_recipe_id, ing_id, amount)
-                )
-                sql_logger.info(f"Query: {sql} | Params: {(new_recipe_id, ing_id, amount)}")
+                ing_params.append((new_recipe_id, ing_id, amount))
 
-    conn.commit()
-    conn.close()
-    print(f"Recipes initialized. Created {len(real_recipes)} recipes.")
+    sql_logger.debug("Query: %s | Batch Size: %s", sql_step, len(steps_params))
+    cursor.executemany(sql_step, steps_params)
+    sql_logger.debug("Query: %s | Batch Size: %s", sql_ing, len(ing_params))
+    cursor.executemany(sql_ing, ing_params)
+
+    report(f"Recipes initialized. Created {len(real_recipes)} recipes.")
     logger.info(f"Recipes initialized. Created {len(real_recipes)} recipes.")
     
-def seed_pantry_sql():
-    conn = sqlite3.connect(DB_FILE)
+def seed_pantry_sql(conn):
     cursor = conn.cursor()
 
     # User 1 is ADMIN
@@ -290,46 +294,64 @@ def seed_pantry_sql():
         ("parmesan cheese", 150) # Need 1
     ]
 
-    print(f"--- Seeding Pantry for User {uid} (Direct SQL) ---")
+    report(f"--- Seeding Pantry for User {uid} (Direct SQL) ---")
 
-    for name, amount in items_to_add:
-        # SQL Logic:
-        # 1. Find the ID for 'flour' inside the items table
-        # 2. Insert that ID and the Amount into the pantry table
-        # 3. If it already exists, REPLACE (overwrite) the old amount
-        sql = """
-        INSERT OR REPLACE INTO pantry (uid, ingredient_id, amount)
-        VALUES (
-            ?, 
-            (SELECT ingredient_id FROM items WHERE ingredient_name = ?), 
-            ?
-        );
-        """
-        
-        
-        try:
-            sql_logger.info(f"Query: {sql} | Params: {(uid, name, amount)}")
+    # SQL Logic (ONE statement for all items):
+    # 1. The (name, amount) pairs are passed in as a VALUES table 'v' (columns: column1, column2)
+    # 2. JOIN with items resolves every name to its ID (unknown names simply drop out)
+    # 3. If a pantry row already exists, REPLACE (overwrite) the old amount
+    # (INSERT first instead of a WITH-CTE, so cursor.rowcount still reports the inserted rows)
+    values = ", ".join(["(?, ?)"] * len(items_to_add))
+    sql = f"""
+    INSERT OR REPLACE INTO pantry (uid, ingredient_id, amount)
+    SELECT ?, i.ingredient_id, v.column2
+    FROM (VALUES {values}) AS v
+    JOIN items i ON i.ingredient_name = v.column1;
+    """
+    params = [uid] + [value for item in items_to_add for value in item]
 
-            cursor.execute(sql, (uid, name, amount))
-            # Check if we actually changed a row (verifies ingredient name existed)
-            if cursor.rowcount > 0:
-                print(f"✅ Inserted: {amount}x {name}")
-            else:
-                print(f"⚠️  Warning: Could not find ingredient '{name}' in database.")
-                
-        except sqlite3.Error as e:
-            print(f"❌ Database Error on {name}: {e}")
+    try:
+        sql_logger.debug("Query: %s | Params: %s", sql, params)
+        cursor.execute(sql, params)
+        # Check how many rows we actually inserted (verifies the ingredient names existed)
+        report(f"✅ Inserted {cursor.rowcount} of {len(items_to_add)} items.")
+        if cursor.rowcount < len(items_to_add):
+            report("⚠️  Warning: Some ingredients could not be found in database.")
+    except sqlite3.Error as e:
+        report(f"❌ Database Error while seeding pantry: {e}")
 
-    conn.commit()
-    conn.close()
     logger.info("--- Pantry Seeding Complete ---")
 
 
 # ---------------------------------------------------------
 # EXECUTION BLOCK
 # ---------------------------------------------------------
+def analyze_db(conn):
+    """Collects table/index statistics, so the query planner picks the covering indexes."""
+    conn.execute("ANALYZE")
+    sql_logger.debug("Query: %s | Params: %s", "ANALYZE", None)
+    logger.info("Database statistics updated (ANALYZE).")
+
+def drop_seed_indexes(conn):
+    """Drops the SEED_DEFERRED_INDEXES before seeding (rebuilt by create_indexes in init_db)."""
+    for index_name in SEED_DEFERRED_INDEXES:
+        sql = f"DROP INDEX IF EXISTS {index_name}"
+        sql_logger.debug("Query: %s | Params: %s", sql, None)
+        conn.execute(sql)
+
 def init_db():
-    init_users()
-    init_ingredients()
-    init_recipes()
-    seed_pantry_sql
\ No newline at end of file
+    # The whole bootstrap shares ONE connection and ONE transaction -> a single commit at the end
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("BEGIN")
+            drop_seed_indexes(conn)
+            init_users(conn)
+            init_ingredients(conn)
+            init_recipes(conn)
+            seed_pantry_sql(conn)
+            create_indexes(conn)
+            analyze_db(conn)
+    finally:
+        conn.close()
+        flush_report()
\ No newline at end of file
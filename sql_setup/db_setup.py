@@ -7,7 +7,7 @@ Last Updated:  2025-12-16
 Description:
     Initializes the SQLite database schema.
     Creates tables for Users, Items, Recipes, Pantry, and their relationships.
-    Run this script once to generate 'cloudcookbook.db'.
+    Run this script once to generate 'cloudcookbook.db' (or the DB set via COOKBOOK_DB).
 
     This schema supports:
     - User Management
@@ -18,20 +18,32 @@ Description:
     - User Pantry (M-to-N relation)
 
 Dependencies:
-    - sqlite3
+    - db_conn (connect)
+    - pydantic_models (lower_strip, for the recipe text migration)
 --------------------------------------------------------------------------------
 """
-import sqlite3
+from helper.db_conn import connect
+from models.pydantic_models import lower_strip
 
-# Database file name
-DB_FILE = "cloudcookbook.db"
+# Indexes (CREATE ... IF NOT EXISTS -> safe to run on every startup, also for older DB files)
+INDEX_STATEMENTS = [
+    # Covering Indexes for the Matchmaking / Cooking queries
+    # All needed columns are inside the index -> SQLite never has to touch the table rows.
+    "CREATE INDEX IF NOT EXISTS idx_ri_recipe ON recipe_ingredients(recipe_id, ingredient_id, needed);",
+    "CREATE INDEX IF NOT EXISTS idx_pantry_uid_ing ON pantry(uid, ingredient_id, amount);",
+    # Steps are always read per recipe, ordered by step_number
+    "CREATE INDEX IF NOT EXISTS idx_steps_recipe ON recipe_steps(recipe_id, step_number);",
+    # Name -> ID lookups + duplicate protection for create_item (INSERT OR IGNORE)
+    # Last in the list: fails on an old DB that already contains duplicate names.
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_items_name ON items(ingredient_name);",
+]
 
 def create_database():
     """
     Connects to SQLite and creates the necessary tables if they do not exist.
     """
     # Establish connection (creates the file if it does not exist)
-    conn = sqlite3.connect(DB_FILE)
+    conn = connect()
     cursor = conn.cursor()
 
     # IMPORTANT: Enable Foreign Key support (defaults to OFF in SQLite)
@@ -89,6 +101,7 @@ def create_database():
     # Table: Pantry (User Inventory)
     # Composite Primary Key (uid + ingredient_id) ensures we don't create 
     # duplicate rows for the same item; we only update the 'amount'.
+    # It is also the conflict target of the Upsert (ON CONFLICT) in db_pantry.modify_pantry.
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS pantry (
         uid INTEGER,
@@ -113,7 +126,55 @@ def create_database():
     );
     """)
 
+    # Indexes (see INDEX_STATEMENTS)
+    # (db_init.analyze_db runs ANALYZE after seeding, so the planner knows about them.)
+    for sql in INDEX_STATEMENTS:
+        cursor.execute(sql)
+
     # Commit changes and close connection
     conn.commit()
     conn.close()
-    print("Database schema successfully created.")
\ No newline at end of file
+    print("Database schema successfully created.")
+
+# One-shot data migration for older DB files: recipe names and steps used to be lowercased on READ,
+# now they are stored lowercase on write (pydantic_models.Recipe / db_init). The WHERE clauses make
+# it a no-op (no writes) once the data is normalized.
+# py_lower_strip is the Python lower_strip registered on the connection (see normalize_recipe_text):
+# SQLite's own lower() only folds ASCII ("Überbackene Spätzle" would keep its capitals).
+NORMALIZE_STATEMENTS = [
+    "UPDATE recipe SET recipe_name = py_lower_strip(recipe_name) WHERE recipe_name <> py_lower_strip(recipe_name);",
+    "UPDATE recipe_steps SET instruction = py_lower_strip(instruction) WHERE instruction <> py_lower_strip(instruction);",
+]
+
+def create_indexes(conn=None):
+    """
+    One-shot migration for existing databases: creates all missing indexes.
+    Called on startup when the DB file already exists (indexes that exist are skipped).
+    With a conn (e.g. db_init.init_db), the indexes are created inside the caller's transaction.
+    """
+    if conn is not None:
+        for sql in INDEX_STATEMENTS:
+            conn.execute(sql)
+        return
+    conn = connect()
+    try:
+        with conn:
+            for sql in INDEX_STATEMENTS:
+                conn.execute(sql)
+    finally:
+        conn.close()
+
+def normalize_recipe_text():
+    """
+    One-shot migration for existing databases: stores recipe names and steps lowercase/trimmed.
+    Called on startup when the DB file already exists (already normalized rows are skipped).
+    """
+    conn = connect()
+    try:
+        # Same function the API used to apply on read -> identical results (incl. non-ASCII)
+        conn.create_function("py_lower_strip", 1, lower_strip, deterministic=True)
+        with conn:
+            for sql in NORMALIZE_STATEMENTS:
+                conn.execute(sql)
+    finally:
+        conn.close()
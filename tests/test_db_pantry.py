@@ -0,0 +1,71 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   test_db_pantry.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+
+Description:
+    Regression tests for helper/db_pantry.modify_pantry (ADD path):
+    if the ingredient can't be created / looked up, no pantry row with
+    ingredient_id NULL may be written and the call must report failure.
+
+Usage:         python -m unittest discover tests   (from the project root)
+--------------------------------------------------------------------------------
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Own throwaway DB file, has to be set before helper.db_conn is imported
+# (never the real DB; all test modules of one run share the DB of the first one)
+if "helper.db_conn" not in sys.modules:
+    os.environ["COOKBOOK_DB"] = os.path.join(tempfile.mkdtemp(), "test_cookbook.db")
+
+from sql_setup.db_setup import create_database
+from helper import db_item
+from helper.db_conn import get_conn, transaction, close_pool
+from helper.db_pantry import modify_pantry
+from models.pydantic_models import PantryAction
+
+
+class ModifyPantryAddTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        create_database()
+        conn = get_conn()
+        with transaction(conn):
+            cls.uid = conn.execute("INSERT INTO user (username) VALUES ('pantry_tester') RETURNING uid").fetchone()[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pool()
+
+    def count_null_rows(self):
+        return get_conn().execute("SELECT COUNT(*) FROM pantry WHERE ingredient_id IS NULL").fetchone()[0]
+
+    def test_failed_item_creation_is_not_upserted(self):
+        with mock.patch("helper.db_pantry.create_item", return_value=False):
+            self.assertFalse(modify_pantry(self.uid, "ghost pepper", 1, PantryAction.ADD))
+        self.assertEqual(self.count_null_rows(), 0)
+
+    def test_lookup_error_is_not_a_miss(self):
+        broken_conn = mock.Mock()
+        broken_conn.cursor.return_value.execute.side_effect = sqlite3.OperationalError("disk I/O error")
+        with mock.patch.object(db_item, "get_conn", return_value=broken_conn):
+            with self.assertRaises(sqlite3.OperationalError):
+                db_item.get_item_id("not cached")
+
+    def test_add_still_works(self):
+        self.assertTrue(modify_pantry(self.uid, "star anise", 2, PantryAction.ADD))
+        item_id = db_item.get_item_id("star anise")
+        amount = get_conn().execute("SELECT amount FROM pantry WHERE uid = ? AND ingredient_id = ?",
+                                    (self.uid, item_id)).fetchone()[0]
+        self.assertEqual(amount, 2)
+        self.assertEqual(self.count_null_rows(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   test_db_recipe.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+
+Description:
+    Regression tests for helper/db_recipe.get_recipe:
+    steps and ingredients must round-trip unchanged, also if they contain
+    control characters (the old group_concat version split on char(30)/char(31)).
+
+Usage:         python -m unittest discover tests   (from the project root)
+--------------------------------------------------------------------------------
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Own throwaway DB file, has to be set before helper.db_conn is imported
+# (never the real DB; all test modules of one run share the DB of the first one)
+if "helper.db_conn" not in sys.modules:
+    os.environ["COOKBOOK_DB"] = os.path.join(tempfile.mkdtemp(), "test_cookbook.db")
+
+from sql_setup.db_setup import create_database
+from helper.db_conn import get_conn, transaction, close_pool
+from helper.db_recipe import create_recipe, get_recipe
+from models.pydantic_models import Recipe
+
+
+class GetRecipeRoundTripTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        create_database()
+        conn = get_conn()
+        with transaction(conn):
+            cls.uid = conn.execute("INSERT INTO user (username) VALUES ('recipe_tester') RETURNING uid").fetchone()[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pool()
+
+    def create(self, ingredients, instructions):
+        recipe = Recipe(recipe_name="round trip", description="d", recipe_creator=self.uid, time_needed=5,
+                        recipe_ingredients=ingredients, instructions=instructions)
+        recipe_id = create_recipe(recipe)
+        self.assertIsInstance(recipe_id, int)
+        return recipe_id, recipe
+
+    def test_control_characters_round_trip(self):
+        ingredients = {"salt\x1epepper": 2, "oil\x1f": 3, "plain": 1}
+        instructions = ["chop\x1fslice", "mix \x1e stir", "serve"]
+        recipe_id, recipe = self.create(ingredients, instructions)
+
+        fetched = get_recipe(recipe_id)
+        self.assertEqual(fetched.instructions, recipe.instructions)
+        self.assertEqual(fetched.recipe_ingredients, recipe.recipe_ingredients)
+
+    def test_steps_keep_their_order(self):
+        recipe_id, recipe = self.create({"water": 1}, [f"step {n}" for n in range(1, 12)])
+        self.assertEqual(get_recipe(recipe_id).instructions, recipe.instructions)
+
+    def test_recipe_without_children(self):
+        recipe_id, _ = self.create({}, [])
+        fetched = get_recipe(recipe_id)
+        self.assertEqual(fetched.instructions, [])
+        self.assertEqual(fetched.recipe_ingredients, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   test_db_setup.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+
+Description:
+    Regression test for sql_setup/db_setup.normalize_recipe_text:
+    recipe names and steps are lowercased like Python's str.lower(),
+    including non-ASCII capitals (SQLite's lower() only folds ASCII).
+
+Usage:         python -m unittest discover tests   (from the project root)
+--------------------------------------------------------------------------------
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Own throwaway DB file, has to be set before helper.db_conn is imported
+# (never the real DB; all test modules of one run share the DB of the first one)
+if "helper.db_conn" not in sys.modules:
+    os.environ["COOKBOOK_DB"] = os.path.join(tempfile.mkdtemp(), "test_cookbook.db")
+
+from sql_setup.db_setup import create_database, normalize_recipe_text
+from helper.db_conn import get_conn, transaction, close_pool
+
+
+class NormalizeRecipeTextTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        create_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pool()
+
+    def test_non_ascii_capitals_are_lowercased(self):
+        conn = get_conn()
+        with transaction(conn):
+            recipe_id = conn.execute(
+                "INSERT INTO recipe (recipe_name, description, time_needed) VALUES (?, ?, ?) RETURNING recipe_id",
+                ("  Überbackene Spätzle ", "Käse!", 30)).fetchone()[0]
+            conn.execute("INSERT INTO recipe_steps (recipe_id, step_number, instruction) VALUES (?, 1, ?)",
+                         (recipe_id, "ÖL Erhitzen "))
+
+        normalize_recipe_text()
+
+        name, description = conn.execute("SELECT recipe_name, description FROM recipe WHERE recipe_id = ?",
+                                         (recipe_id,)).fetchone()
+        step = conn.execute("SELECT instruction FROM recipe_steps WHERE recipe_id = ?", (recipe_id,)).fetchone()[0]
+        self.assertEqual(name, "überbackene spätzle")
+        self.assertEqual(step, "öl erhitzen")
+        self.assertEqual(description, "Käse!") # descriptions are not touched
+
+
+if __name__ == "__main__":
+    unittest.main()
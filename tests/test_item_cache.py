@@ -0,0 +1,88 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   test_item_cache.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+
+Description:
+    Regression test for the item Name <-> ID cache (helper/db_item.py):
+    an item created inside a transaction that is rolled back must NOT stay in the cache,
+    otherwise its ID is handed out again for the next new item.
+
+Usage:         python -m unittest discover tests   (from the project root)
+--------------------------------------------------------------------------------
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Own throwaway DB file, has to be set before helper.db_conn is imported
+# (never the real DB; all test modules of one run share the DB of the first one)
+if "helper.db_conn" not in sys.modules:
+    os.environ["COOKBOOK_DB"] = os.path.join(tempfile.mkdtemp(), "test_cookbook.db")
+
+from sql_setup.db_setup import create_database
+from helper import db_item
+from helper.db_conn import get_conn, transaction, close_pool
+from helper.db_pantry import modify_pantry
+from models.pydantic_models import PantryAction
+
+
+class ItemCacheRollbackTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        create_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pool()
+
+    def test_rolled_back_item_is_not_cached(self):
+        conn = get_conn()
+        with self.assertRaises(RuntimeError):
+            with transaction(conn):
+                self.assertTrue(db_item.create_item("truffle"))
+                self.assertIsNotNone(db_item.get_item_id("truffle"))
+                raise RuntimeError("force rollback")
+
+        self.assertIsNone(db_item.get_item_id("truffle"))
+        # The freed ID must belong to the new item only
+        self.assertTrue(db_item.create_item("caviar"))
+        self.assertIsNone(db_item.get_item_id("truffle"))
+
+    def test_failed_pantry_add_does_not_cache_item(self):
+        # UID 999 does not exist -> FK error -> modify_pantry rolls back the new item as well
+        self.assertFalse(modify_pantry(999, "saffron", 1, PantryAction.ADD))
+        self.assertIsNone(db_item.get_item_id("saffron"))
+        self.assertNotIn("saffron", db_item._item_id_cache)
+
+    def test_committed_item_is_cached(self):
+        conn = get_conn()
+        with transaction(conn):
+            self.assertTrue(db_item.create_item("vanilla pod"))
+            # Not committed yet -> not cached yet
+            self.assertNotIn("vanilla pod", db_item._item_id_cache)
+        item_id = db_item._item_id_cache["vanilla pod"]
+        self.assertEqual(db_item.get_item_name(item_id), "vanilla pod")
+
+    def test_resolved_items_are_cached_after_commit(self):
+        conn = get_conn()
+        with transaction(conn):
+            name_to_id = db_item.resolve_item_ids(["nori", "miso"])
+            self.assertNotIn("nori", db_item._item_id_cache)
+        self.assertEqual(db_item._item_id_cache["nori"], name_to_id["nori"])
+        self.assertEqual(db_item._item_id_cache["miso"], name_to_id["miso"])
+
+    def test_resolved_items_are_not_cached_on_rollback(self):
+        conn = get_conn()
+        with self.assertRaises(RuntimeError):
+            with transaction(conn):
+                db_item.resolve_item_ids(["wasabi"])
+                raise RuntimeError("force rollback")
+        self.assertNotIn("wasabi", db_item._item_id_cache)
+        self.assertIsNone(db_item.get_item_id("wasabi"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+--------------------------------------------------------------------------------
+Script Name:   test_transaction.py
+Project:       CloudCookbook (Team 2 - Appelt, Nguyen, Hoppen)
+
+Description:
+    Regression test for helper/db_conn.transaction():
+    a failing COMMIT must be rolled back, so the pooled connection doesn't stay
+    in_transaction and the next transaction() opens a fresh BEGIN.
+
+Usage:         python -m unittest discover tests   (from the project root)
+--------------------------------------------------------------------------------
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+# Own throwaway DB file, has to be set before helper.db_conn is imported
+# (never the real DB; all test modules of one run share the DB of the first one)
+if "helper.db_conn" not in sys.modules:
+    os.environ["COOKBOOK_DB"] = os.path.join(tempfile.mkdtemp(), "test_cookbook.db")
+
+from sql_setup.db_setup import create_database
+from helper.db_conn import get_conn, transaction, on_commit, close_pool
+
+
+class TransactionCommitFailureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        create_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pool()
+
+    def test_failed_commit_is_rolled_back(self):
+        conn = get_conn()
+        callbacks = []
+        with self.assertRaises(sqlite3.IntegrityError):
+            with transaction(conn):
+                # FK check deferred to COMMIT -> the COMMIT itself fails (uid 999 doesn't exist)
+                conn.execute("PRAGMA defer_foreign_keys=ON")
+                conn.execute("INSERT INTO pantry (uid, ingredient_id, amount) VALUES (999, 999, 1)")
+                on_commit(conn, lambda: callbacks.append("ran"))
+
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(callbacks, []) # never committed -> callback dropped
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM pantry WHERE uid = 999").fetchone()[0], 0)
+
+        # The next transaction starts its own BEGIN (and is really committed)
+        with transaction(conn):
+            self.assertTrue(conn.in_transaction)
+            conn.execute("INSERT INTO user (username) VALUES ('after_failed_commit')")
+            on_commit(conn, lambda: callbacks.append("ran"))
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(callbacks, ["ran"])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM user WHERE username = 'after_failed_commit'").fetchone()[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()